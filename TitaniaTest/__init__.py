@@ -4,16 +4,45 @@ import glob
 import time
 import random
 import datetime
+import re
+import collections
+import concurrent.futures
+import math
+import sqlite3
+import json
+import queue
+import threading
+import socketserver
+import tracemalloc
 import serial
+import psutil
 from typing import NamedTuple
-import keyboard
 from pypylon import pylon, genicam
 import cv2
+import numpy as np
+
+
+# Values written to the success columns of the log file
+# Full error messages are written to the event log
+SUCCESS_CODE = "1"
+ERR_CAMERA = "CAMERA_ERROR"
+ERR_CAMERA_RUNTIME = "CAMERA_RUNTIME_ERROR"
+ERR_CAMERA_TIMEOUT = "CAMERA_TIMEOUT"
+ERR_GRAB_FAIL = "GRAB_FAIL"
+ERR_NOT_GRABBING = "NOT_GRABBING"
+ERR_SERIAL = "SERIAL_FAILED"
+ERR_SERIAL_DISCONNECTED = "SERIAL_DISCONNECTED"
+
+
+class CameraParams(NamedTuple):
+    serial: str
+    role: str
+    exposure: float
+    flip_image: bool
 
 
 class TitaniaTestParams(NamedTuple):
-    left_serial: str
-    right_serial: str
+    cameras: list
     output_folderpath: str
     capture_fps: float
     save_fps: float
@@ -23,8 +52,13 @@ class TitaniaTestParams(NamedTuple):
     external_serial_port: str
     virtual_camera: bool
     timeout: float
-    right_exposure: float
-    left_exposure: float
+    adaptive_save: bool
+    min_save_fps: float
+    steady_state_threshold: float
+    steady_state_window: float
+    create_thumbnails: bool
+    control_port: int
+    profile_period: float
 
 
 def getLeftRightSerialFromTitaniaSerial(titania_serial: str) -> str:
@@ -78,12 +112,53 @@ def getLeftRightSerialFromTitaniaSerial(titania_serial: str) -> str:
 
 
 def validateTitaniaTestParams(test_params: TitaniaTestParams) -> bool:
-    # Check valid camera serial
-    if test_params.left_serial == "" and test_params.right_serial == "":
-        raise Exception("Camera serial empty")
+    # Check valid cameras
+    if len(test_params.cameras) == 0:
+        raise Exception("No cameras specified")
+    for camera in test_params.cameras:
+        if camera.serial == "":
+            raise Exception("Camera serial empty")
+        if camera.role == "":
+            raise Exception("Camera role empty for camera: " + camera.serial)
+        # Role is used in log column names and image file names
+        if re.fullmatch("[A-Za-z0-9-]+", camera.role) is None:
+            raise Exception("Invalid camera role: " + camera.role + " \
+                Roles may only contain letters, numbers and '-'")
+        if camera.role in IMAGE_SUFFIXES.values():
+            raise Exception("Camera role '" + camera.role + "' is reserved \
+                as an image file name suffix")
+    serials = [camera.serial for camera in test_params.cameras]
+    if len(set(serials)) != len(serials):
+        raise Exception("Camera serials must be unique")
+    roles = [camera.role for camera in test_params.cameras]
+    if len(set(roles)) != len(roles):
+        raise Exception("Camera roles must be unique")
+    if "external" in roles:
+        raise Exception("Camera role 'external' is reserved \
+            for external serial device")
     # Save rate must be less than or equal to capture rate
     if test_params.save_fps > test_params.capture_fps:
         raise Exception("Save FPS must be less than or equal to capture FPS")
+    if test_params.adaptive_save:
+        # Adaptive save rate is driven by camera temperature readings
+        if not test_params.capture_temperature:
+            raise Exception(
+                "Adaptive save requires temperature capture to be enabled")
+        if test_params.min_save_fps <= 0.0:
+            raise Exception("Minimum save FPS must be greater than zero")
+        if test_params.min_save_fps > test_params.save_fps:
+            raise Exception(
+                "Minimum save FPS must be less than or equal to save FPS")
+        if test_params.steady_state_threshold <= 0.0:
+            raise Exception("Steady state threshold must be greater than zero")
+        if test_params.steady_state_window <= 0.0:
+            raise Exception("Steady state window must be greater than zero")
+    if test_params.create_thumbnails and not test_params.save_images:
+        raise Exception("Thumbnails require image saving to be enabled")
+    if test_params.control_port < 0 or test_params.control_port > 65535:
+        raise Exception("Control port must be between 0 and 65535")
+    if test_params.profile_period < 0.0:
+        raise Exception("Profile period must be positive number in seconds")
 
 
 def enableCameraEmulation(enable: bool):
@@ -103,6 +178,31 @@ def checkSerialPairConnected(left_serial: str, right_serial: str) -> bool:
     return True
 
 
+def checkCameraSerialsConnected(serials: list) -> bool:
+    camera_serials = getCameraSerials()
+    # Check they are connected
+    for serial_number in serials:
+        if serial_number not in camera_serials:
+            raise Exception("Camera not found: " + serial_number)
+    return True
+
+
+def getStereoCameraParams(left_serial: str, right_serial: str,
+                          left_exposure: float,
+                          right_exposure: float) -> list:
+    # Get camera params for a Titania stereo pair
+    # Left camera is mounted upside down so images are flipped
+    cameras = [
+        CameraParams(
+            serial=left_serial, role="left",
+            exposure=left_exposure, flip_image=True),
+        CameraParams(
+            serial=right_serial, role="right",
+            exposure=right_exposure, flip_image=False)
+    ]
+    return cameras
+
+
 def getSerialPairConnected() -> list:
     camera_serials = getCameraSerials()
     # Check only two cameras are connected and get their serials
@@ -190,19 +290,214 @@ def getLogFileName(timestamp: str) -> str:
     return log_file_name
 
 
-def saveFrame(excel_time, left_image_filename, right_image_filename,
-              left_temp, right_temp, test_params, external_serial_data,
-              left_success, right_success, external_serial_success,
+def getRateLogFileName(timestamp: str) -> str:
+    # Create save rate log file name from unix time
+    rate_log_file_name = "TitaniaTestRate_" + timestamp + ".txt"
+    return rate_log_file_name
+
+
+class ThermalRateController:
+    # Adapts the save rate to the thermal state of the cameras.
+    # dT/dt is estimated online from a least squares fit of the temperature
+    # samples inside a sliding time window. While any camera is changing
+    # temperature the maximum save rate is used, once all cameras have
+    # settled the save rate drops to the steady state floor.
+    # Hysteresis stops the rate toggling when dT/dt is close to the threshold.
+    hysteresis = 2.0
+
+    def __init__(self, max_save_fps: float, min_save_fps: float,
+                 threshold: float, window: float):
+        self.max_save_fps = max_save_fps
+        self.min_save_fps = min_save_fps
+        # threshold is given in degrees C per minute
+        self.threshold = threshold
+        self.window = window
+        self.samples = collections.deque()
+        self.dtdt = None
+        # Start at the maximum rate to capture the warm up transient
+        self.save_fps = max_save_fps
+
+    def setMaxSaveFPS(self, max_save_fps: float) -> None:
+        # Change maximum save rate used during transients
+        if self.save_fps == self.max_save_fps:
+            self.save_fps = max_save_fps
+        self.max_save_fps = max_save_fps
+
+    def estimateDtDt(self) -> float:
+        # Largest absolute temperature gradient across cameras
+        # (degrees C per minute)
+        n = len(self.samples)
+        times = [sample[0] for sample in self.samples]
+        time_mean = sum(times) / n
+        time_var = sum((t - time_mean) ** 2 for t in times)
+        if time_var <= 0.0:
+            return None
+        dtdt = 0.0
+        num_cameras = len(self.samples[0][1])
+        for i in range(num_cameras):
+            temps = [sample[1][i] for sample in self.samples]
+            temp_mean = sum(temps) / n
+            cov = sum((t - time_mean) * (temp - temp_mean)
+                      for t, temp in zip(times, temps))
+            dtdt = max(dtdt, abs(cov / time_var) * 60.0)
+        return dtdt
+
+    def update(self, sample_time: float, temperatures: list) -> bool:
+        # Add temperature sample and re-evaluate save rate
+        # Returns True if the save rate has changed
+        self.samples.append((sample_time, temperatures))
+        while sample_time - self.samples[0][0] > self.window:
+            self.samples.popleft()
+        self.dtdt = self.estimateDtDt()
+        if self.dtdt is None:
+            return False
+        # Only decide steady state once the window is mostly filled
+        window_span = sample_time - self.samples[0][0]
+        if self.save_fps == self.max_save_fps:
+            if window_span >= self.window / 2.0 \
+                    and self.dtdt < self.threshold:
+                self.save_fps = self.min_save_fps
+                return True
+        elif self.dtdt > self.threshold * self.hysteresis:
+            self.save_fps = self.max_save_fps
+            return True
+        return False
+
+
+def write_rate_log_header(rate_log_filepath):
+    # write save rate log file header line
+    f = open(rate_log_filepath, "w")
+    f.write("time,save_fps,dtdt\n")
+    f.close()
+
+
+def saveRateChange(excel_time, save_fps, dtdt, rate_log_filepath) -> None:
+    # create log message for change in save rate
+    rate_msg = "{},{},{:.4F}\n".format(excel_time, save_fps, dtdt)
+    print("Save rate changed to {} fps (dT/dt: {:.4F} C/min)".format(
+        save_fps, dtdt))
+    f = open(rate_log_filepath, "a")
+    f.write(rate_msg)
+    f.close()
+
+
+def getEventLogFileName(timestamp: str) -> str:
+    # Create error event log file name from unix time
+    event_log_file_name = "TitaniaTestEvents_" + timestamp + ".txt"
+    return event_log_file_name
+
+
+def getSuccessCode(error) -> str:
+    # Get value for success column of log file
+    # '1' on success otherwise the error code
+    if error is None:
+        return SUCCESS_CODE
+    return error[0]
+
+
+class ErrorEventLog:
+    # Records error events to a separate log file.
+    # Identical consecutive errors from the same source are
+    # run-length encoded into a single event with the time of the first
+    # and last occurrence and the number of times the error occurred.
+    # Each event is written when it starts (without end time and count)
+    # so it is not lost if the test is killed, and written again with
+    # the end time and count when it ends.
+    def __init__(self, event_log_filepath: str):
+        self.event_log_filepath = event_log_filepath
+        # Error event currently in progress for each source
+        self.active_events = {}
+        f = open(self.event_log_filepath, "w")
+        f.write("start_time,end_time,source,code,count,message\n")
+        f.close()
+
+    def update(self, source: str, error, event_time: str) -> None:
+        # Update event for source with result of latest iteration
+        # error should be None on success or (code, message)
+        event = self.active_events.get(source)
+        if event is not None:
+            if error is not None \
+                    and error[0] == event["code"] \
+                    and error[1] == event["message"]:
+                event["end_time"] = event_time
+                event["count"] += 1
+                return
+            self.flush(source)
+        if error is not None:
+            print("{} {}: {}".format(source, error[0], error[1]))
+            event = {
+                "start_time": event_time, "end_time": event_time,
+                "code": error[0], "message": error[1], "count": 1}
+            self.active_events[source] = event
+            self.writeEvent(source, event, "", "")
+
+    def writeEvent(self, source: str, event, end_time: str,
+                   count: str) -> None:
+        event_msg = "{},{},{},{},{},{}\n".format(
+            event["start_time"], end_time, source, event["code"],
+            count, string_cleaning(event["message"]))
+        f = open(self.event_log_filepath, "a")
+        f.write(event_msg)
+        f.close()
+
+    def flush(self, source: str) -> None:
+        # Write end of event in progress for source to file
+        event = self.active_events.pop(source, None)
+        if event is None:
+            return
+        self.writeEvent(
+            source, event, event["end_time"], str(event["count"]))
+
+    def close(self) -> None:
+        for source in list(self.active_events.keys()):
+            self.flush(source)
+
+
+# Left and right cameras use short suffixes in image file names
+IMAGE_SUFFIXES = {"left": "l", "right": "r"}
+
+
+def getImageFileName(image_tag_time: str, role: str) -> str:
+    # Create image file name from capture time and camera role
+    image_suffix = IMAGE_SUFFIXES.get(role, role)
+    image_file_name = image_tag_time + "_" + image_suffix + ".png"
+    return image_file_name
+
+
+def parseImageFileName(image_file_name: str):
+    # Get capture time (in log file format) and camera role
+    # from image file name e.g. '2021-08-16_14_04_58_000000_l.png'
+    # Returns None if the file name is not a test image
+    match = re.fullmatch(
+        "([0-9]{4}-[0-9]{2}-[0-9]{2})_([0-9]{2})_([0-9]{2})_([0-9]{2})"
+        "_([0-9]{6})_(.+)[.]png", image_file_name)
+    if match is None:
+        return None
+    day, hour, minute, second, microsecond, image_suffix = match.groups()
+    excel_time = "{} {}:{}:{}.{}".format(
+        day, hour, minute, second, microsecond)
+    role = image_suffix
+    for camera_role, suffix in IMAGE_SUFFIXES.items():
+        if suffix == image_suffix:
+            role = camera_role
+    return excel_time, role
+
+
+def saveFrame(excel_time, timestamps, image_filenames, temps, test_params,
+              external_serial_data, successes, external_serial_success,
               log_filepath, hour_log_filepath, day_log_filepath) -> None:
     # create log message
+    # timestamps, image_filenames, temps and successes
+    # are given in camera order
     log_msg = excel_time+","
+    log_msg += ",".join(timestamps) + ","
     if test_params.save_images:
-        log_msg += left_image_filename + "," + right_image_filename + ","
+        log_msg += ",".join(image_filenames) + ","
     if test_params.capture_temperature:
-        log_msg += left_temp + "," + right_temp + ","
+        log_msg += ",".join(temps) + ","
     if test_params.enable_external_serial:
         log_msg += external_serial_data + ","
-    log_msg += left_success + "," + right_success
+    log_msg += ",".join(successes)
     if test_params.enable_external_serial:
         log_msg += "," + external_serial_success
     log_msg += "\n"
@@ -216,33 +511,43 @@ def saveFrame(excel_time, left_image_filename, right_image_filename,
         f.close()
 
 
+def setCameraFrameRate(camera, capture_fps: float,
+                       virtual_camera: bool) -> None:
+    if virtual_camera:
+        camera.AcquisitionFrameRateAbs.SetValue(capture_fps)
+    else:
+        camera.AcquisitionFrameRate.SetValue(capture_fps)
+    camera.AcquisitionFrameRateEnable.SetValue(True)
+
+
 def connectCameras(test_params):
+    num_cameras = len(test_params.cameras)
     try:
         # Get the transport layer factory.
         tlFactory = pylon.TlFactory.GetInstance()
 
         # Get all attached devices and exit application if no device is found.
         devices = tlFactory.EnumerateDevices()
-        if len(devices) < 2:
+        if len(devices) < num_cameras:
             raise pylon.RuntimeException(
-                "Missing cameras. Requires at least 2 cameras are connected.")
+                "Missing cameras. Requires at least {} cameras are "
+                "connected.".format(num_cameras))
 
         # Create an array of instant cameras
-        cameras = pylon.InstantCameraArray(2)
-        cameras_found = [False, False]
+        cameras = pylon.InstantCameraArray(num_cameras)
+        cameras_found = [False] * num_cameras
 
         # Create and attach Pylon Devices.
         # Attach to camera serials from params
-        # Left camera assigned to index 0, right camera to index 1
+        # Cameras are assigned in the order given in params
+        camera_serials = [camera.serial for camera in test_params.cameras]
         for device in devices:
             # Print the serial of the camera.
             cam_serial = device.GetSerialNumber()
-            if (cam_serial == test_params.left_serial):
-                cameras[0].Attach(tlFactory.CreateDevice(device))
-                cameras_found[0] = True
-            if (cam_serial == test_params.right_serial):
-                cameras[1].Attach(tlFactory.CreateDevice(device))
-                cameras_found[1] = True
+            if cam_serial in camera_serials:
+                i = camera_serials.index(cam_serial)
+                cameras[i].Attach(tlFactory.CreateDevice(device))
+                cameras_found[i] = True
 
         if False in cameras_found:
             error_msg = "Failed to find specified camera serials \
@@ -255,20 +560,16 @@ def connectCameras(test_params):
 
         for cam in cameras:
             # Set capture rate
-            if test_params.virtual_camera:
-                cam.AcquisitionFrameRateAbs.SetValue(test_params.capture_fps)
-            else:
-                cam.AcquisitionFrameRate.SetValue(test_params.capture_fps)
-            cam.AcquisitionFrameRateEnable.SetValue(True)
+            setCameraFrameRate(
+                cam, test_params.capture_fps, test_params.virtual_camera)
 
-        # Set exposure
-        cameras[0].ExposureTime.SetValue(test_params.left_exposure)
-        cameras[1].ExposureTime.SetValue(test_params.right_exposure)
-
-        # Flip left camera images
-        if not test_params.virtual_camera:
-            cameras[0].ReverseX.SetValue(True)
-            cameras[0].ReverseY.SetValue(True)
+        for i, camera_params in enumerate(test_params.cameras):
+            # Set exposure
+            cameras[i].ExposureTime.SetValue(camera_params.exposure)
+            # Flip camera images
+            if camera_params.flip_image and not test_params.virtual_camera:
+                cameras[i].ReverseX.SetValue(True)
+                cameras[i].ReverseY.SetValue(True)
 
     except genicam.GenericException as e:
         # Error handling
@@ -278,16 +579,600 @@ def connectCameras(test_params):
     return cameras
 
 
+# Time between estimates of camera clock offset (seconds)
+CLOCK_OFFSET_PERIOD = 60.0
+
+
+class CameraClock:
+    # Maps camera hardware timestamps onto the host monotonic clock.
+    # The clock offset is estimated periodically by latching the camera
+    # timestamp between two reads of the host clock. For cameras without
+    # timestamp latch support the smallest difference between the host
+    # arrival time and camera timestamp in each period is used instead,
+    # as images always arrive after they are exposed.
+    def __init__(self, camera):
+        # USB camera timestamps are in nanoseconds
+        self.tick_frequency = 1e9
+        try:
+            # GigE cameras give the timestamp tick frequency
+            self.tick_frequency = \
+                float(camera.GevTimestampTickFrequency.GetValue())
+        except genicam.GenericException:
+            pass
+        self.offset = None
+        self.last_estimate_time = None
+        self.latch_available = True
+
+    def latchTimestamp(self, camera) -> int:
+        # Read current camera timestamp (ticks)
+        try:
+            camera.TimestampLatch.Execute()
+            return camera.TimestampLatchValue.GetValue()
+        except genicam.GenericException:
+            camera.GevTimestampControlLatch.Execute()
+            return camera.GevTimestampValue.GetValue()
+
+    def update(self, camera, grab_result, arrival_time: float) -> float:
+        # Get host monotonic time that grab result was exposed
+        # arrival_time is the host monotonic time the result was retrieved
+        # from this camera, not after results from all cameras are retrieved
+        camera_time = grab_result.GetTimeStamp() / self.tick_frequency
+        estimate_due = self.last_estimate_time is None or \
+            arrival_time - self.last_estimate_time >= CLOCK_OFFSET_PERIOD
+        if estimate_due:
+            self.last_estimate_time = arrival_time
+        if estimate_due and self.latch_available:
+            try:
+                host_before = time.monotonic()
+                latch_time = self.latchTimestamp(camera) / self.tick_frequency
+                host_after = time.monotonic()
+                self.offset = (host_before + host_after) / 2.0 - latch_time
+            except genicam.GenericException:
+                self.latch_available = False
+        if not self.latch_available:
+            arrival_offset = arrival_time - camera_time
+            if estimate_due or arrival_offset < self.offset:
+                self.offset = arrival_offset
+        return camera_time + self.offset
+
+
+def getControlLogFileName(timestamp: str) -> str:
+    # Create control log file name from unix time
+    control_log_file_name = "TitaniaTestControl_" + timestamp + ".txt"
+    return control_log_file_name
+
+
+def saveControlCommand(excel_time, command, result,
+                       control_log_filepath) -> None:
+    # create log message for control command
+    control_msg = "{},{},{}\n".format(
+        excel_time, string_cleaning(command), string_cleaning(result))
+    print("Control command: {} ({})".format(command, result))
+    f = open(control_log_filepath, "a")
+    f.write(control_msg)
+    f.close()
+
+
+# Time to wait for the test to reply to a control command (seconds)
+# Must be longer than the camera retrieve timeout
+CONTROL_REPLY_TIMEOUT = 30.0
+
+
+class ControlRequestHandler(socketserver.StreamRequestHandler):
+    # Reads one command per line and writes one reply per line
+    def handle(self):
+        for line in self.rfile:
+            command = line.decode("utf-8").strip()
+            if command == "":
+                continue
+            reply = self.server.control_server.submit(command)
+            self.wfile.write((reply + "\n").encode("utf-8"))
+
+
+class ControlTCPServer(socketserver.ThreadingTCPServer):
+    # Port can be bound again while connections from a previous test
+    # (e.g. the last ramp step) are still closing
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ControlServer:
+    # Local TCP control channel used to change the test while it is running.
+    # Commands are received on background threads and queued so they are
+    # applied by the test loop between grabs.
+    def __init__(self, port: int):
+        self.commands = queue.Queue()
+        self.server = ControlTCPServer(
+            ("127.0.0.1", port), ControlRequestHandler)
+        self.server.control_server = self
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def submit(self, command: str) -> str:
+        # Queue command and wait for reply from test loop
+        reply = queue.Queue(maxsize=1)
+        self.commands.put((command, reply))
+        try:
+            return reply.get(timeout=CONTROL_REPLY_TIMEOUT)
+        except queue.Empty:
+            return "ERROR test not responding"
+
+    def pendingCommands(self) -> list:
+        # Get queued commands without blocking
+        commands = []
+        while True:
+            try:
+                commands.append(self.commands.get_nowait())
+            except queue.Empty:
+                return commands
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def applyControlCommand(command: str, test_params: TitaniaTestParams,
+                        cameras):
+    # Apply control command that changes test params
+    # Camera settings are changed live through the camera nodes
+    # Returns updated test params and reply
+    fields = command.split()
+    name = fields[0].lower()
+    args = fields[1:]
+    try:
+        if name == "save_fps":
+            save_fps = float(args[0])
+            if not math.isfinite(save_fps) or save_fps <= 0.0:
+                return test_params, \
+                    "ERROR save_fps must be a positive number"
+            if save_fps > test_params.capture_fps:
+                return test_params, \
+                    "ERROR save_fps must be between 0 and capture_fps"
+            if test_params.adaptive_save \
+                    and save_fps < test_params.min_save_fps:
+                return test_params, \
+                    "ERROR save_fps must be greater than min_save_fps"
+            return test_params._replace(save_fps=save_fps), "OK"
+        elif name == "capture_fps":
+            capture_fps = float(args[0])
+            if not math.isfinite(capture_fps) or capture_fps <= 0.0:
+                return test_params, \
+                    "ERROR capture_fps must be a positive number"
+            if capture_fps < test_params.save_fps:
+                return test_params, \
+                    "ERROR capture_fps must be greater than save_fps"
+            for i in range(len(test_params.cameras)):
+                setCameraFrameRate(
+                    cameras[i], capture_fps, test_params.virtual_camera)
+            return test_params._replace(capture_fps=capture_fps), "OK"
+        elif name in ["exposure", "left_exposure", "right_exposure"]:
+            if name == "exposure":
+                role = args[0]
+                exposure = float(args[1])
+            else:
+                role = name.split("_")[0]
+                exposure = float(args[0])
+            if not math.isfinite(exposure) or exposure <= 0.0:
+                return test_params, \
+                    "ERROR exposure must be a positive number"
+            roles = [camera.role for camera in test_params.cameras]
+            if role not in roles:
+                return test_params, "ERROR unknown camera role: " + role
+            i = roles.index(role)
+            cameras[i].ExposureTime.SetValue(exposure)
+            camera_params = list(test_params.cameras)
+            camera_params[i] = camera_params[i]._replace(exposure=exposure)
+            return test_params._replace(cameras=camera_params), "OK"
+        else:
+            return test_params, "ERROR unknown command: " + name
+    except (IndexError, ValueError):
+        return test_params, "ERROR invalid arguments: " + command
+    except genicam.GenericException as e:
+        return test_params, "ERROR " + string_cleaning(str(e))
+
+
+def getProfileLogFileName(timestamp: str) -> str:
+    # Create resource profile log file name from unix time
+    profile_log_file_name = "TitaniaTestProfile_" + timestamp + ".txt"
+    return profile_log_file_name
+
+
+def getHeapProfileLogFileName(timestamp: str) -> str:
+    # Create heap profile log file name from unix time
+    heap_log_file_name = "TitaniaTestProfileHeap_" + timestamp + ".txt"
+    return heap_log_file_name
+
+
+# Number of samples at the start of the test excluded from leak checks
+# while buffers, caches and connections are allocated
+PROFILE_WARMUP_SAMPLES = 5
+# Number of recent samples checked for growth of each resource
+PROFILE_GROWTH_SAMPLES = 20
+# Minimum fraction of changes between recent samples that must not fall
+PROFILE_GROWTH_NON_DECREASING = 0.8
+# Minimum number of separate increases over the recent samples,
+# so a single step (e.g. a new worker thread) is not flagged
+PROFILE_GROWTH_MIN_INCREASES = 3
+# Minimum rise of each resource over the recent samples
+PROFILE_GROWTH_MIN_CHANGE = {
+    "rss": 4 * 1024 * 1024,
+    "fds": 3,
+    "threads": 3,
+    "heap": 1024 * 1024
+}
+# Number of call sites with the largest heap growth to log per sample
+PROFILE_TOP_SITES = 10
+
+
+class SoakProfiler:
+    # Samples process resource usage during long running tests.
+    # Resource usage and pylon buffer counts are written as a time series
+    # and python heap growth since the start of the test is written by
+    # call site. After the warm-up samples, resources with sustained
+    # growth over the last PROFILE_GROWTH_SAMPLES samples are flagged
+    # as a possible leak.
+    growth_metrics = ["rss", "fds", "threads", "heap"]
+
+    def __init__(self, profile_log_filepath: str, heap_log_filepath: str,
+                 roles: list):
+        self.profile_log_filepath = profile_log_filepath
+        self.heap_log_filepath = heap_log_filepath
+        self.process = psutil.Process()
+        self.history = {
+            metric: collections.deque(maxlen=PROFILE_GROWTH_SAMPLES)
+            for metric in self.growth_metrics}
+        self.flagged = set()
+        self.num_samples = 0
+        header_msg = "time,rss,fds,threads,heap,camera_reconnects," \
+            "serial_reconnects,"
+        for role in roles:
+            header_msg += role + "_ready_buffers," \
+                + role + "_queued_buffers,"
+        header_msg += "growth\n"
+        f = open(self.profile_log_filepath, "w")
+        f.write(header_msg)
+        f.close()
+        f = open(self.heap_log_filepath, "w")
+        f.write("time,rank,size_diff,count_diff,site\n")
+        f.close()
+        # Heap growth is measured against the start of the test
+        tracemalloc.start()
+        self.baseline = self.takeSnapshot()
+
+    def takeSnapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def openFileDescriptors(self) -> int:
+        if sys.platform.startswith('win'):
+            return self.process.num_handles()
+        return self.process.num_fds()
+
+    def checkGrowth(self, metric: str, value: int) -> bool:
+        # Check if metric has sustained growth over recent samples
+        # Growth must be mostly non-decreasing, made of several increases
+        # and rise by at least the minimum change for the metric
+        history = self.history[metric]
+        history.append(value)
+        if len(history) < PROFILE_GROWTH_SAMPLES:
+            return False
+        values = list(history)
+        changes = [b - a for a, b in zip(values, values[1:])]
+        non_decreasing = len([c for c in changes if c >= 0])
+        increases = len([c for c in changes if c > 0])
+        return non_decreasing >= PROFILE_GROWTH_NON_DECREASING * len(changes) \
+            and increases >= PROFILE_GROWTH_MIN_INCREASES \
+            and values[-1] - values[0] >= PROFILE_GROWTH_MIN_CHANGE[metric]
+
+    def sample(self, excel_time, cameras, camera_reconnects: int,
+               serial_reconnects: int) -> None:
+        heap, _ = tracemalloc.get_traced_memory()
+        metrics = {
+            "rss": self.process.memory_info().rss,
+            "fds": self.openFileDescriptors(),
+            "threads": self.process.num_threads(),
+            "heap": heap
+        }
+        growth = []
+        self.num_samples += 1
+        if self.num_samples > PROFILE_WARMUP_SAMPLES:
+            for metric in self.growth_metrics:
+                if self.checkGrowth(metric, metrics[metric]):
+                    growth.append(metric)
+                    if metric not in self.flagged:
+                        print("WARNING: {} has grown over the last {} "
+                              "profile samples. Possible leak.".format(
+                                  metric, PROFILE_GROWTH_SAMPLES))
+        # Only warn again once growth has stopped and restarted
+        self.flagged = set(growth)
+
+        profile_msg = "{},{},{},{},{},{},{},".format(
+            excel_time, metrics["rss"], metrics["fds"], metrics["threads"],
+            metrics["heap"], camera_reconnects, serial_reconnects)
+        for camera in cameras:
+            try:
+                profile_msg += "{},{},".format(
+                    camera.NumReadyBuffers.GetValue(),
+                    camera.NumQueuedBuffers.GetValue())
+            except genicam.GenericException:
+                profile_msg += ",,"
+        profile_msg += ";".join(growth) + "\n"
+        f = open(self.profile_log_filepath, "a")
+        f.write(profile_msg)
+        f.close()
+
+        # Log call sites with the largest heap growth
+        stats = self.takeSnapshot().compare_to(self.baseline, "lineno")
+        heap_msg = ""
+        for rank, stat in enumerate(stats[:PROFILE_TOP_SITES]):
+            frame = stat.traceback[0]
+            heap_msg += "{},{},{},{},{}\n".format(
+                excel_time, rank, stat.size_diff, stat.count_diff,
+                string_cleaning("{}:{}".format(frame.filename, frame.lineno)))
+        f = open(self.heap_log_filepath, "a")
+        f.write(heap_msg)
+        f.close()
+
+    def close(self) -> None:
+        tracemalloc.stop()
+
+
+def retrieveCameraResult(camera):
+    # Retrieve latest grab result from camera
+    # Returns the grab result, error (None on success),
+    # if the camera should be reconnected and the host monotonic time
+    # the result arrived from this camera (None on failure)
+    try:
+        grab_result = camera.RetrieveResult(
+            20000, pylon.TimeoutHandling_ThrowException)
+        arrival_time = time.monotonic()
+        if not grab_result.GrabSucceeded():
+            return grab_result, (ERR_GRAB_FAIL, ""), False, arrival_time
+        return grab_result, None, False, arrival_time
+    except pylon.TimeoutException as e:
+        return None, (ERR_CAMERA_TIMEOUT, str(e)), False, None
+    except genicam.GenericException as e:
+        return None, (ERR_CAMERA, str(e)), True, None
+    except genicam.RuntimeException as e:
+        return None, (ERR_CAMERA_RUNTIME, str(e)), True, None
+    except pylon.RuntimeException as e:
+        return None, (ERR_CAMERA_RUNTIME, str(e)), True, None
+
+
+def saveCameraImage(grab_result, image_filepath, create_thumbnails=False):
+    # Save image from grab result to file
+    # Returns error (None on success), if the camera should be reconnected
+    # and the image thumbnails (empty if not created)
+    thumbnails = []
+    try:
+        img = grab_result.GetArray()
+        cv2.imwrite(image_filepath, img)
+        if create_thumbnails:
+            thumbnails = createThumbnails(img)
+        return None, False, thumbnails
+    except genicam.GenericException as e:
+        return (ERR_CAMERA, str(e)), True, thumbnails
+    except genicam.RuntimeException as e:
+        return (ERR_CAMERA_RUNTIME, str(e)), True, thumbnails
+    except pylon.RuntimeException as e:
+        return (ERR_CAMERA_RUNTIME, str(e)), True, thumbnails
+
+
+# Maximum width (pixels) of largest thumbnail in pyramid
+THUMBNAIL_WIDTH = 320
+# Number of levels in thumbnail pyramid, each half the size of the last
+THUMBNAIL_LEVELS = 3
+THUMBNAIL_JPEG_QUALITY = 80
+# Maximum number of thumbnails in an hour contact sheet
+CONTACT_SHEET_MAX_TILES = 100
+# Maximum number of images added to the thumbnail store between commits
+THUMBNAIL_COMMIT_IMAGES = 100
+# Maximum time between commits of thumbnails added to the store (seconds)
+THUMBNAIL_COMMIT_PERIOD = 10.0
+
+
+def getThumbnailStoreFileName() -> str:
+    return "TitaniaTestThumbnails.db"
+
+
+def createThumbnails(img) -> list:
+    # Create thumbnail pyramid from image
+    # Returns list of (level, width, height, jpeg data)
+    # Level 0 is the largest thumbnail
+    thumbnail = img
+    while thumbnail.shape[1] > THUMBNAIL_WIDTH:
+        thumbnail = cv2.pyrDown(thumbnail)
+    thumbnails = []
+    for level in range(THUMBNAIL_LEVELS):
+        if level > 0:
+            thumbnail = cv2.pyrDown(thumbnail)
+        _, data = cv2.imencode(
+            ".jpg", thumbnail,
+            [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_JPEG_QUALITY])
+        thumbnails.append(
+            (level, thumbnail.shape[1], thumbnail.shape[0], data.tobytes()))
+    return thumbnails
+
+
+def loadThumbnails(image_filepath: str) -> list:
+    # Create thumbnail pyramid from image file
+    img = cv2.imread(image_filepath, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        return []
+    return createThumbnails(img)
+
+
+class ThumbnailStore:
+    # Thumbnails and hourly contact sheets of saved images
+    # stored in a single SQLite database in the output folder.
+    # Thumbnails are indexed by capture time so any time range can be
+    # shown without reading the full size images.
+    def __init__(self, folderpath: str):
+        self.filepath = os.path.join(folderpath, getThumbnailStoreFileName())
+        self.connection = sqlite3.connect(self.filepath, timeout=30.0)
+        # Write ahead log so contact sheets can be read and written by
+        # another connection without blocking thumbnails being added
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            "filename TEXT, time TEXT, hour TEXT, role TEXT, "
+            "level INTEGER, width INTEGER, height INTEGER, data BLOB, "
+            "PRIMARY KEY (filename, level))")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS thumbnails_time "
+            "ON thumbnails (level, time)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS contact_sheets ("
+            "hour TEXT, role TEXT, columns INTEGER, count INTEGER, "
+            "data BLOB, PRIMARY KEY (hour, role))")
+        self.connection.commit()
+        self.uncommitted_images = 0
+        self.last_commit_time = time.monotonic()
+
+    def hasImage(self, image_filename: str) -> bool:
+        cursor = self.connection.execute(
+            "SELECT 1 FROM thumbnails WHERE filename = ? LIMIT 1",
+            (image_filename,))
+        return cursor.fetchone() is not None
+
+    def addThumbnails(self, image_filename: str, thumbnails: list) -> None:
+        # Add thumbnail pyramid of image to store
+        # Thumbnails are not written to the database until commit is called
+        # (see commitIfDue)
+        excel_time, role = parseImageFileName(image_filename)
+        hour = excel_time[:13]
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO thumbnails "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(image_filename, excel_time, hour, role,
+              level, width, height, data)
+             for level, width, height, data in thumbnails])
+        self.uncommitted_images += 1
+
+    def commit(self) -> None:
+        if self.uncommitted_images > 0:
+            self.connection.commit()
+        self.uncommitted_images = 0
+        self.last_commit_time = time.monotonic()
+
+    def commitIfDue(self) -> None:
+        # Commit thumbnails in batches to limit disk syncs
+        if self.uncommitted_images >= THUMBNAIL_COMMIT_IMAGES \
+                or time.monotonic() - self.last_commit_time \
+                >= THUMBNAIL_COMMIT_PERIOD:
+            self.commit()
+
+    def buildContactSheets(self, hour: str) -> None:
+        # Create contact sheet for each camera from the smallest
+        # thumbnails in the hour (e.g. '2021-08-16 14')
+        roles = self.connection.execute(
+            "SELECT DISTINCT role FROM thumbnails WHERE hour = ?",
+            (hour,)).fetchall()
+        for (role,) in roles:
+            tiles = self.connection.execute(
+                "SELECT data FROM thumbnails "
+                "WHERE hour = ? AND role = ? AND level = ? ORDER BY time",
+                (hour, role, THUMBNAIL_LEVELS - 1)).fetchall()
+            if len(tiles) > CONTACT_SHEET_MAX_TILES:
+                # Sample thumbnails evenly across the hour
+                step = len(tiles) / CONTACT_SHEET_MAX_TILES
+                tiles = [
+                    tiles[int(i * step)]
+                    for i in range(CONTACT_SHEET_MAX_TILES)]
+            images = [
+                cv2.imdecode(np.frombuffer(data, np.uint8),
+                             cv2.IMREAD_UNCHANGED)
+                for (data,) in tiles]
+            tile_height, tile_width = images[0].shape[:2]
+            columns = int(math.ceil(math.sqrt(len(images))))
+            rows = int(math.ceil(len(images) / columns))
+            sheet = np.zeros(
+                (rows * tile_height, columns * tile_width)
+                + images[0].shape[2:], images[0].dtype)
+            for i, image in enumerate(images):
+                if image.shape != images[0].shape:
+                    image = cv2.resize(image, (tile_width, tile_height))
+                x = (i % columns) * tile_width
+                y = (i // columns) * tile_height
+                sheet[y:y + tile_height, x:x + tile_width] = image
+            _, data = cv2.imencode(
+                ".jpg", sheet,
+                [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_JPEG_QUALITY])
+            self.connection.execute(
+                "INSERT OR REPLACE INTO contact_sheets VALUES (?, ?, ?, ?, ?)",
+                (hour, role, columns, len(images), data.tobytes()))
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def buildHourContactSheets(folderpath: str, hour: str) -> None:
+    # Create contact sheets for the hour using a separate connection
+    # to the thumbnail store so this can be run in a background thread
+    thumbnail_store = ThumbnailStore(folderpath)
+    try:
+        thumbnail_store.buildContactSheets(hour)
+    finally:
+        thumbnail_store.close()
+
+
+def buildThumbnailStore(output_folderpath: str) -> int:
+    # Create thumbnails and contact sheets for images in an existing
+    # test output folder. Images already in the store are skipped so
+    # this can be run again while a test is running.
+    thumbnail_store = ThumbnailStore(output_folderpath)
+    image_filepaths = sorted(glob.glob(
+        os.path.join(output_folderpath, "*", "*", "*.png")))
+    # Skip images already in the store and files not named as test images
+    image_filepaths = [
+        image_filepath for image_filepath in image_filepaths
+        if parseImageFileName(os.path.basename(image_filepath)) is not None
+        and not thumbnail_store.hasImage(os.path.basename(image_filepath))]
+    print("Creating thumbnails for {} images".format(len(image_filepaths)))
+
+    # Images are decoded and downsampled in parallel
+    hours = set()
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=os.cpu_count())
+    try:
+        for image_filepath, thumbnails in zip(
+                image_filepaths,
+                executor.map(loadThumbnails, image_filepaths)):
+            image_filename = os.path.basename(image_filepath)
+            if len(thumbnails) == 0:
+                print("Failed to read image: " + image_filepath)
+                continue
+            thumbnail_store.addThumbnails(image_filename, thumbnails)
+            hours.add(parseImageFileName(image_filename)[0][:13])
+            thumbnail_store.commitIfDue()
+        thumbnail_store.commit()
+
+        for hour in sorted(hours):
+            print("Creating contact sheets for hour: " + hour)
+            thumbnail_store.buildContactSheets(hour)
+    finally:
+        executor.shutdown()
+        thumbnail_store.close()
+    return 0
+
+
 def write_log_header(log_filepath, test_params):
     # create log file header line
+    # columns are created for each camera using the camera role
+    roles = [camera.role for camera in test_params.cameras]
     header_msg = "time,"
+    header_msg += ",".join([role + "_timestamp" for role in roles]) + ","
     if test_params.save_images:
-        header_msg += "left_img,right_img,"
+        header_msg += ",".join([role + "_img" for role in roles]) + ","
     if test_params.capture_temperature:
-        header_msg += "left_temp,right_temp,"
+        header_msg += ",".join([role + "_temp" for role in roles]) + ","
     if test_params.enable_external_serial:
         header_msg += "external_data,"
-    header_msg += "left_success,right_success"
+    header_msg += ",".join([role + "_success" for role in roles])
     if test_params.enable_external_serial:
         header_msg += ",external_success"
     header_msg += "\n"
@@ -301,10 +1186,16 @@ def string_cleaning(str_to_clean):
     return str_to_clean.replace('\n', ' ').replace('\r', '').replace(',', '.')
 
 
-def run(test_params: TitaniaTestParams) -> int:
+def run(test_params: TitaniaTestParams, grab_stats=None,
+        save_all_frames: bool = False) -> int:
+    # grab_stats (GrabStatistics) is updated with every grab if given
+    # If save_all_frames is set every grab is saved ignoring save_fps
 
     exit_code = 0
     test_start_time = datetime.datetime.now()
+    # All times during the test are measured on the host monotonic clock
+    # relative to the start of the test
+    test_start_monotonic = time.monotonic()
     timestamp = test_start_time.strftime('%Y-%m-%d_%H_%M_%S_%f')
     # Generate names for filepaths
     log_filename = getLogFileName(timestamp)
@@ -321,63 +1212,141 @@ def run(test_params: TitaniaTestParams) -> int:
         ext_ser.flushInput()
 
     cameras = connectCameras(test_params)
+    num_cameras = len(test_params.cameras)
+    # Camera reads and image saves are run in parallel across cameras
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=num_cameras)
+    camera_clocks = [CameraClock(cameras[i]) for i in range(num_cameras)]
 
     # Write log file header line
     write_log_header(log_filepath, test_params)
 
     # Calculate save rate (in seconds)
     save_rate = 1.0 / test_params.save_fps
-    last_save_time = time.time()
-
-    cam_err_msg = "CAMERA ERROR. likely camera disconnected: "
-    cam_run_err_msg = \
-        "CAMERA RUNTIME ERROR. likely camera disconnected: "
+    last_save_time = time.monotonic()
+
+    rate_controller = None
+    if test_params.adaptive_save:
+        rate_controller = ThermalRateController(
+            test_params.save_fps, test_params.min_save_fps,
+            test_params.steady_state_threshold,
+            test_params.steady_state_window)
+        rate_log_filepath = os.path.join(
+            test_params.output_folderpath, getRateLogFileName(timestamp))
+        write_rate_log_header(rate_log_filepath)
+        # Temperature is sampled at the maximum save rate so transients
+        # are detected while saving at the steady state rate
+        temp_sample_rate = 1.0 / test_params.save_fps
+        last_temp_sample_time = time.monotonic()
+
+    # Error messages are written to a separate event log
+    event_log = ErrorEventLog(os.path.join(
+        test_params.output_folderpath, getEventLogFileName(timestamp)))
+
+    # Day and hour folders are only checked when the hour changes
+    last_day_hour_timestamp = None
+
+    thumbnail_store = None
+    contact_sheet_executor = None
+    if test_params.create_thumbnails:
+        thumbnail_store = ThumbnailStore(test_params.output_folderpath)
+        # Contact sheets are created in the background so the
+        # grab loop is not delayed at the end of each hour
+        contact_sheet_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1)
+
+    control_server = None
+    if test_params.control_port != 0:
+        control_log_filepath = os.path.join(
+            test_params.output_folderpath, getControlLogFileName(timestamp))
+        f = open(control_log_filepath, "w")
+        f.write("time,command,result\n")
+        f.close()
+    saving_paused = False
+    frames_saved = 0
+
+    camera_reconnects = 0
+    serial_reconnects = 0
+    profiler = None
+    if test_params.profile_period > 0:
+        profiler = SoakProfiler(
+            os.path.join(test_params.output_folderpath,
+                         getProfileLogFileName(timestamp)),
+            os.path.join(test_params.output_folderpath,
+                         getHeapProfileLogFileName(timestamp)),
+            [camera.role for camera in test_params.cameras])
+        last_profile_time = None
+    last_temps = [""] * num_cameras
+    last_successes = [""] * num_cameras
 
     try:
-        start_time = time.time()
+        if test_params.control_port != 0:
+            # Opened here so cameras are released if the port is in use
+            try:
+                control_server = ControlServer(test_params.control_port)
+            except OSError as e:
+                print("Failed to open control channel on port {}: {}".format(
+                    test_params.control_port, e))
+                exit_code = 1
+                return exit_code
+            print("Control channel listening on port: ",
+                  test_params.control_port)
+
+        start_time = time.monotonic()
         while True:
             try:
                 if test_params.timeout > 0:
-                    test_duration = time.time() - start_time
+                    test_duration = time.monotonic() - start_time
                     if test_duration > test_params.timeout:
                         exit_code = 0
                         break
 
-                # Get capture time
-                time_now = datetime.datetime.now()
+                # Get capture time from monotonic clock
+                time_now = test_start_time + datetime.timedelta(
+                    seconds=time.monotonic() - test_start_monotonic)
                 # Convert to excel datetime serial
+                # All other timestamps are taken from this string
                 excel_time = time_now.strftime('%Y-%m-%d %H:%M:%S.%f')
-                image_tag_time = time_now.strftime('%Y-%m-%d_%H_%M_%S_%f')
-
-                # Create new folder for data on every day
-                day_timestamp = time_now.strftime('%Y-%m-%d')
-                day_folder_path = os.path.join(
-                    test_params.output_folderpath, day_timestamp)
-                day_log_filepath = os.path.join(
-                    day_folder_path, getLogFileName(day_timestamp))
-                if not os.path.exists(day_folder_path):
-                    os.makedirs(day_folder_path)
-                    write_log_header(day_log_filepath, test_params)
-
-                # Create new folder for data on every hour
-                day_hour_timestamp = time_now.strftime('%Y-%m-%d %H')
-                hour_folder_path = os.path.join(
-                    day_folder_path, day_hour_timestamp)
-                hour_log_filepath = os.path.join(
-                    hour_folder_path, getLogFileName(day_hour_timestamp))
-                if not os.path.exists(hour_folder_path):
-                    os.makedirs(hour_folder_path)
-                    write_log_header(hour_log_filepath, test_params)
+                image_tag_time = excel_time.replace(" ", "_") \
+                    .replace(":", "_").replace(".", "_")
+
+                day_hour_timestamp = excel_time[:13]
+                if day_hour_timestamp != last_day_hour_timestamp:
+                    if thumbnail_store is not None \
+                            and last_day_hour_timestamp is not None:
+                        # Create contact sheets for the previous hour
+                        # once all its thumbnails are committed
+                        thumbnail_store.commit()
+                        contact_sheet_executor.submit(
+                            buildHourContactSheets,
+                            test_params.output_folderpath,
+                            last_day_hour_timestamp)
+                    last_day_hour_timestamp = day_hour_timestamp
+                    # Create new folder for data on every day
+                    day_timestamp = excel_time[:10]
+                    day_folder_path = os.path.join(
+                        test_params.output_folderpath, day_timestamp)
+                    day_log_filepath = os.path.join(
+                        day_folder_path, getLogFileName(day_timestamp))
+                    if not os.path.exists(day_folder_path):
+                        os.makedirs(day_folder_path)
+                        write_log_header(day_log_filepath, test_params)
+
+                    # Create new folder for data on every hour
+                    hour_folder_path = os.path.join(
+                        day_folder_path, day_hour_timestamp)
+                    hour_log_filepath = os.path.join(
+                        hour_folder_path, getLogFileName(day_hour_timestamp))
+                    if not os.path.exists(hour_folder_path):
+                        os.makedirs(hour_folder_path)
+                        write_log_header(hour_log_filepath, test_params)
 
                 # Define default values for log data
-                left_temp = ""
-                right_temp = ""
+                temps = [""] * num_cameras
+                timestamps = [""] * num_cameras
                 ext_ser_data = ""
-                left_image_filename = ""
-                right_image_filename = ""
-                left_success = "0"
-                right_success = "0"
-                ext_ser_success = "0"
+                image_filenames = [""] * num_cameras
+                errors = [None] * num_cameras
+                ext_ser_error = None
 
                 reconnect_camera = False
 
@@ -390,13 +1359,11 @@ def run(test_params: TitaniaTestParams) -> int:
                         # read twice to make sure complete data is received
                         ser_bytes = ext_ser.readline()
                         ext_ser_data = ser_bytes.decode("utf-8").rstrip()
-                        ext_ser_success = "1"
                     except serial.SerialException as e:
                         # There is no new data from serial port
                         ext_ser_data = ""
-                        ext_ser_success = \
-                            "SERAIL FAILED. Likely disconnected: {}".format(
-                                str(e))
+                        ext_ser_error = (ERR_SERIAL, str(e))
+                        serial_reconnects += 1
                         try:
                             # try to re-connect
                             ext_ser.close()
@@ -410,7 +1377,8 @@ def run(test_params: TitaniaTestParams) -> int:
                     except TypeError:
                         # Disconnect of USB->UART occured
                         ext_ser_data = ""
-                        ext_ser_success = "DISCONNECTED"
+                        ext_ser_error = (ERR_SERIAL_DISCONNECTED, "")
+                        serial_reconnects += 1
                         try:
                             # try to re-connect
                             ext_ser.close()
@@ -429,190 +1397,235 @@ def run(test_params: TitaniaTestParams) -> int:
                 try:
                     grabbing = cameras.IsGrabbing()
                 except genicam.GenericException as e:
-                    left_success = cam_err_msg + "{}".format(str(e))
-                    right_success = cam_err_msg + "{}".format(str(e))
+                    errors = [(ERR_CAMERA, str(e))] * num_cameras
                     grabbing = False
                     reconnect_camera = True
                 except genicam.RuntimeException as e:
-                    left_success = cam_run_err_msg + "{}".format(str(e))
-                    right_success = cam_run_err_msg + "{}".format(str(e))
+                    errors = [(ERR_CAMERA_RUNTIME, str(e))] * num_cameras
                     grabbing = False
                     reconnect_camera = True
                 except pylon.RuntimeException as e:
-                    left_success = cam_run_err_msg + "{}".format(str(e))
-                    right_success = cam_run_err_msg + "{}".format(str(e))
+                    errors = [(ERR_CAMERA_RUNTIME, str(e))] * num_cameras
                     grabbing = False
                     reconnect_camera = True
 
                 # Check cameras are grabbing
                 if grabbing:
-                    grabResult_left = None
-                    grabResult_right = None
-                    # Read camera data
-                    try:
-                        grabResult_left = cameras[0].RetrieveResult(
-                            20000, pylon.TimeoutHandling_ThrowException)
-                    except pylon.TimeoutException as e:
-                        left_success = "CAMERA TIMEOUT: {}".format(str(e))
-                    except genicam.GenericException as e:
-                        left_success = cam_err_msg + "{}".format(str(e))
-                        reconnect_camera = True
-                    except genicam.RuntimeException as e:
-                        left_success = cam_run_err_msg + "{}".format(str(e))
-                        reconnect_camera = True
-                    except pylon.RuntimeException as e:
-                        left_success = cam_run_err_msg + "{}".format(str(e))
-                        reconnect_camera = True
-
-                    try:
-                        grabResult_right = cameras[1].RetrieveResult(
-                            20000, pylon.TimeoutHandling_ThrowException)
-                    except pylon.TimeoutException as e:
-                        right_success = "CAMERA TIMEOUT: {}".format(str(e))
-                    except genicam.GenericException as e:
-                        right_success = cam_err_msg + "{}".format(str(e))
-                        reconnect_camera = True
-                    except genicam.RuntimeException as e:
-                        right_success = cam_run_err_msg + "{}".format(str(e))
-                        reconnect_camera = True
-                    except pylon.RuntimeException as e:
-                        right_success = cam_run_err_msg + "{}".format(str(e))
-                        reconnect_camera = True
-
-                    time_since_save = time.time() - last_save_time
-                    if time_since_save > save_rate:
+                    camera_list = [cameras[i] for i in range(num_cameras)]
+                    # Read camera data from all cameras in parallel
+                    grab_results = []
+                    arrival_times = []
+                    for i, (grab_result, error, reconnect, arrival_time) \
+                            in enumerate(executor.map(
+                                retrieveCameraResult, camera_list)):
+                        grab_results.append(grab_result)
+                        arrival_times.append(arrival_time)
+                        errors[i] = error
+                        reconnect_camera = reconnect_camera or reconnect
+
+                    # Map camera timestamps onto host monotonic clock
+                    # Latency is from exposure to arrival at the host
+                    latencies = [None] * num_cameras
+                    for i in range(num_cameras):
+                        if errors[i] is None:
+                            exposure_time = camera_clocks[i].update(
+                                camera_list[i], grab_results[i],
+                                arrival_times[i])
+                            timestamps[i] = "{:.6F}".format(
+                                exposure_time - test_start_monotonic)
+                            latencies[i] = arrival_times[i] - exposure_time
+                    if grab_stats is not None:
+                        grab_stats.update(grab_results, errors, latencies)
+
+                    time_since_save = time.monotonic() - last_save_time
+                    save_due = \
+                        save_all_frames or time_since_save > save_rate
+                    if save_due and not saving_paused:
                         save_this_frame = True
-                        last_save_time = time.time()
-
-                    if save_this_frame:
-                        # Save camera images to file
-                        try:
-                            if grabResult_left is not None:
-                                if grabResult_left.GrabSucceeded():
-                                    left_success = "1"
-                                    if test_params.save_images:
-                                        img = grabResult_left.GetArray()
-                                        left_image_filename = \
-                                            image_tag_time + "_l.png"
-                                        left_image_filepath = os.path.join(
-                                            hour_folder_path,
-                                            left_image_filename)
-                                        cv2.imwrite(left_image_filepath, img)
-                                else:
-                                    left_success = "GRAB FAIL"
-                            else:
-                                left_success = "NO IMAGE DATA"
-                        except genicam.GenericException as e:
-                            left_success = cam_err_msg + "{}".format(str(e))
-                            reconnect_camera = True
-                        except genicam.RuntimeException as e:
-                            left_success = \
-                                cam_run_err_msg + "{}".format(str(e))
-                            reconnect_camera = True
-                        except pylon.RuntimeException as e:
-                            left_success = \
-                                cam_run_err_msg + "{}".format(str(e))
-                            reconnect_camera = True
-
-                        try:
-                            if grabResult_right is not None:
-                                if grabResult_right.GrabSucceeded():
-                                    right_success = "1"
-                                    if test_params.save_images:
-                                        img = grabResult_right.GetArray()
-                                        right_image_filename = \
-                                            image_tag_time + "_r.png"
-                                        right_image_filepath = os.path.join(
-                                            hour_folder_path,
-                                            right_image_filename)
-                                        cv2.imwrite(right_image_filepath, img)
-                                else:
-                                    right_success = "GRAB FAIL"
-                            else:
-                                right_success = "NO IMAGE DATA"
-                        except genicam.GenericException as e:
-                            right_success = cam_err_msg + "{}".format(str(e))
-                            reconnect_camera = True
-                        except genicam.RuntimeException as e:
-                            right_success = \
-                                cam_run_err_msg + "{}".format(str(e))
-                            reconnect_camera = True
-                        except pylon.RuntimeException as e:
-                            right_success = \
-                                cam_run_err_msg + "{}".format(str(e))
-                            reconnect_camera = True
-
-                        if test_params.capture_temperature:
-                            # Get temperature
-                            if test_params.virtual_camera:
-                                # generate fake temperature values
-                                left_temp_data = random.uniform(30, 60)
-                                right_temp_data = random.uniform(30, 60)
-                            else:
-                                try:
-                                    # read temperature from cameras
-                                    left_temp_data = \
-                                        cameras[0].DeviceTemperature.GetValue()
-                                    right_temp_data = \
-                                        cameras[1].DeviceTemperature.GetValue()
-                                except genicam.GenericException as e:
-                                    left_success = \
-                                        cam_err_msg + "{}".format(str(e))
-                                    right_success = \
-                                        cam_err_msg + "{}".format(str(e))
-                                    reconnect_camera = True
-                                except genicam.RuntimeException as e:
-                                    left_success = \
-                                        cam_run_err_msg + "{}".format(str(e))
-                                    right_success = \
-                                        cam_run_err_msg + "{}".format(str(e))
-                                    reconnect_camera = True
-                                except pylon.RuntimeException as e:
-                                    left_success = \
-                                        cam_run_err_msg + "{}".format(str(e))
-                                    right_success = \
-                                        cam_run_err_msg + "{}".format(str(e))
-                                    reconnect_camera = True
-                            left_temp = "{:.3F}".format(left_temp_data)
-                            right_temp = "{:.3F}".format(right_temp_data)
+                        last_save_time = time.monotonic()
+
+                    sample_temperature = \
+                        save_this_frame and test_params.capture_temperature
+                    if rate_controller is not None:
+                        time_since_sample = \
+                            time.monotonic() - last_temp_sample_time
+                        if time_since_sample > temp_sample_rate:
+                            sample_temperature = True
+                    if sample_temperature and rate_controller is not None:
+                        last_temp_sample_time = time.monotonic()
+
+                    if save_this_frame and test_params.save_images:
+                        # Save camera images to file in parallel
+                        save_indices = [
+                            i for i in range(num_cameras) if errors[i] is None]
+                        for i in save_indices:
+                            image_filenames[i] = getImageFileName(
+                                image_tag_time, test_params.cameras[i].role)
+                        save_results = executor.map(
+                            saveCameraImage,
+                            [grab_results[i] for i in save_indices],
+                            [os.path.join(hour_folder_path, image_filenames[i])
+                             for i in save_indices],
+                            [test_params.create_thumbnails]
+                            * len(save_indices))
+                        for i, (error, reconnect, thumbnails) in zip(
+                                save_indices, save_results):
+                            errors[i] = error
+                            reconnect_camera = reconnect_camera or reconnect
+                            if len(thumbnails) > 0:
+                                thumbnail_store.addThumbnails(
+                                    image_filenames[i], thumbnails)
+                        if thumbnail_store is not None:
+                            thumbnail_store.commitIfDue()
+
+                    if sample_temperature:
+                        # Get temperature
+                        if test_params.virtual_camera:
+                            # generate fake temperature values
+                            temps_data = [
+                                random.uniform(30, 60)
+                                for i in range(num_cameras)]
+                        else:
+                            temps_data = None
+                            try:
+                                # read temperature from cameras
+                                temps_data = [
+                                    camera.DeviceTemperature.GetValue()
+                                    for camera in camera_list]
+                            except genicam.GenericException as e:
+                                errors = [(ERR_CAMERA, str(e))] * num_cameras
+                                reconnect_camera = True
+                            except genicam.RuntimeException as e:
+                                errors = [
+                                    (ERR_CAMERA_RUNTIME, str(e))
+                                ] * num_cameras
+                                reconnect_camera = True
+                            except pylon.RuntimeException as e:
+                                errors = [
+                                    (ERR_CAMERA_RUNTIME, str(e))
+                                ] * num_cameras
+                                reconnect_camera = True
+                        if temps_data is not None:
+                            temps = [
+                                "{:.3F}".format(temp) for temp in temps_data]
+
+                        if rate_controller is not None \
+                                and temps_data is not None:
+                            # Update save rate from temperature gradient
+                            rate_changed = rate_controller.update(
+                                time.monotonic(), temps_data)
+                            if rate_changed:
+                                save_rate = 1.0 / rate_controller.save_fps
+                                saveRateChange(
+                                    excel_time, rate_controller.save_fps,
+                                    rate_controller.dtdt, rate_log_filepath)
                 else:
-                    left_success = "NOT GRABBING"
-                    right_success = "NOT GRABBING"
+                    errors = [(ERR_NOT_GRABBING, "")] * num_cameras
                     reconnect_camera = True
 
+                # Record errors to event log
+                for camera_params, error in zip(test_params.cameras, errors):
+                    event_log.update(camera_params.role, error, excel_time)
+                if test_params.enable_external_serial:
+                    event_log.update("external", ext_ser_error, excel_time)
+
                 if save_this_frame:
-                    left_success = string_cleaning(left_success)
-                    right_success = string_cleaning(right_success)
+                    successes = [getSuccessCode(error) for error in errors]
+                    ext_ser_success = getSuccessCode(ext_ser_error)
                     ext_ser_data = string_cleaning(ext_ser_data)
-                    ext_ser_success = string_cleaning(ext_ser_success)
 
                     saveFrame(
-                        excel_time, left_image_filename, right_image_filename,
-                        left_temp, right_temp, test_params, ext_ser_data,
-                        left_success, right_success, ext_ser_success,
+                        excel_time, timestamps, image_filenames, temps,
+                        test_params, ext_ser_data, successes, ext_ser_success,
                         log_filepath, hour_log_filepath, day_log_filepath)
+                    frames_saved += 1
+                    last_temps = temps
+                    last_successes = successes
 
                 if reconnect_camera:
+                    camera_reconnects += 1
                     grab_except_msg = \
                         "Unexpected exception when trying to re-start grabbing"
                     # try to restart camera connection
                     try:
                         cameras = connectCameras(test_params)
+                        # Camera clocks may be reset on reconnect
+                        camera_clocks = [
+                            CameraClock(cameras[i])
+                            for i in range(num_cameras)]
                     except pylon.RuntimeException as e:
                         print(str(e))
                     except:
                         print(grab_except_msg + ": ", sys.exc_info()[0])
 
-                if keyboard.is_pressed("q"):
-                    print("Test manually stopped")
-                    exit_code = 1
+                stop_test = False
+                if control_server is not None:
+                    for command, reply in control_server.pendingCommands():
+                        name = command.split()[0].lower()
+                        if name == "status":
+                            roles = [
+                                camera.role for camera in test_params.cameras]
+                            status = {
+                                "time": excel_time,
+                                "duration": time.monotonic() - start_time,
+                                "paused": saving_paused,
+                                "capture_fps": test_params.capture_fps,
+                                "save_fps": 1.0 / save_rate,
+                                "frames_saved": frames_saved,
+                                "exposure": {
+                                    camera.role: camera.exposure
+                                    for camera in test_params.cameras},
+                                "temperature": dict(zip(roles, last_temps)),
+                                "success": dict(zip(roles, last_successes))
+                            }
+                            reply.put(json.dumps(status))
+                            continue
+                        if name == "stop":
+                            stop_test = True
+                            result = "OK"
+                        elif name == "pause":
+                            saving_paused = True
+                            result = "OK"
+                        elif name == "resume":
+                            saving_paused = False
+                            result = "OK"
+                        else:
+                            test_params, result = applyControlCommand(
+                                command, test_params, cameras)
+                            # Update save rate from test params
+                            if rate_controller is not None:
+                                rate_controller.setMaxSaveFPS(
+                                    test_params.save_fps)
+                                save_rate = 1.0 / rate_controller.save_fps
+                                temp_sample_rate = 1.0 / test_params.save_fps
+                            else:
+                                save_rate = 1.0 / test_params.save_fps
+                        saveControlCommand(
+                            excel_time, command, result, control_log_filepath)
+                        reply.put(result)
+
+                if profiler is not None:
+                    if last_profile_time is None or time.monotonic() \
+                            - last_profile_time >= test_params.profile_period:
+                        last_profile_time = time.monotonic()
+                        profiler.sample(
+                            excel_time, cameras, camera_reconnects,
+                            serial_reconnects)
+
+                if stop_test:
+                    print("Test stopped by control command")
+                    exit_code = 0
                     break
 
-            except genicam.GenericException:
-                saveFrame(excel_time, left_image_filename, right_image_filename,
-                          left_temp, right_temp, test_params, ext_ser_data,
-                          left_success, right_success, ext_ser_success,
-                          log_filepath)
+            except genicam.GenericException as e:
+                errors = [(ERR_CAMERA, str(e))] * num_cameras
+                for camera_params, error in zip(test_params.cameras, errors):
+                    event_log.update(camera_params.role, error, excel_time)
+                saveFrame(excel_time, timestamps, image_filenames, temps,
+                          test_params, ext_ser_data,
+                          [getSuccessCode(error) for error in errors],
+                          getSuccessCode(ext_ser_error),
+                          log_filepath, hour_log_filepath, day_log_filepath)
     except KeyboardInterrupt:
         print("Test manually stopped.")
         exit_code = 0
@@ -621,10 +1634,240 @@ def run(test_params: TitaniaTestParams) -> int:
         print("Unexpected exception during test:", sys.exc_info()[0])
         exit_code = 1
         return exit_code
+    finally:
+        # Write any errors still in progress to event log
+        event_log.close()
+        executor.shutdown(wait=False)
+        if control_server is not None:
+            control_server.close()
+        if profiler is not None:
+            profiler.close()
+        if thumbnail_store is not None:
+            thumbnail_store.commit()
+            thumbnail_store.close()
+            if last_day_hour_timestamp is not None:
+                contact_sheet_executor.submit(
+                    buildHourContactSheets,
+                    test_params.output_folderpath,
+                    last_day_hour_timestamp)
+            # Wait for contact sheets to be written before exiting
+            contact_sheet_executor.shutdown(wait=True)
+        try:
+            # Release cameras so they can be connected by the next test
+            cameras.StopGrabbing()
+            cameras.Close()
+        except genicam.GenericException:
+            pass
 
     return exit_code
 
 
+class GrabStatistics:
+    # Grab performance statistics collected during a test
+    # Used by the ramp test to find the maximum sustainable capture rate
+    def __init__(self, num_cameras: int):
+        self.num_cameras = num_cameras
+        self.frames = [0] * num_cameras
+        self.skipped = [0] * num_cameras
+        self.timeouts = 0
+        self.errors = 0
+        self.latencies = []
+        self.start_time = None
+        self.end_time = None
+
+    def update(self, grab_results: list, errors: list,
+               latencies: list) -> None:
+        # Add results of grabbing from all cameras
+        # latencies is the time from exposure to arrival at the host
+        # for each camera (None if grab failed)
+        update_time = time.monotonic()
+        if self.start_time is None:
+            # Measure from the time of the first grab
+            # to exclude camera connection time
+            self.start_time = update_time
+            return
+        self.end_time = update_time
+        for i in range(self.num_cameras):
+            if errors[i] is None:
+                self.frames[i] += 1
+                self.latencies.append(latencies[i])
+                self.skipped[i] += \
+                    grab_results[i].GetNumberOfSkippedImages()
+            elif errors[i][0] == ERR_CAMERA_TIMEOUT:
+                self.timeouts += 1
+            else:
+                self.errors += 1
+
+    def duration(self) -> float:
+        if self.end_time is None:
+            return 0.0
+        return self.end_time - self.start_time
+
+    def deliveredFPS(self) -> float:
+        # Frame rate delivered by the slowest camera
+        duration = self.duration()
+        if duration <= 0.0:
+            return 0.0
+        return min(self.frames) / duration
+
+
+class RampStepResult(NamedTuple):
+    capture_fps: float
+    exposure: str
+    save_images: bool
+    delivered_fps: float
+    frames: int
+    skipped: int
+    timeouts: int
+    errors: int
+    mean_latency: float
+    max_latency: float
+    sustained: bool
+
+
+# Ramp step is sustained if delivered rate is within tolerance
+# of the capture rate and no more than the allowed fraction of
+# frames are skipped with no timeouts or camera errors
+RAMP_FPS_TOLERANCE = 0.95
+RAMP_MAX_SKIPPED_FRACTION = 0.01
+
+
+def getRampExposure(cameras: list, exposure: float = None) -> str:
+    # Get exposure (us) tested in ramp step for logging
+    # Exposure of each camera joined by ';' if not set by the ramp
+    if exposure is not None:
+        return "{}".format(exposure)
+    return ";".join("{}".format(camera.exposure) for camera in cameras)
+
+
+def getRampStepResult(step_params: TitaniaTestParams, exposure: str,
+                      grab_stats: GrabStatistics) -> RampStepResult:
+    frames = sum(grab_stats.frames)
+    skipped = sum(grab_stats.skipped)
+    delivered_fps = grab_stats.deliveredFPS()
+    mean_latency = 0.0
+    max_latency = 0.0
+    if len(grab_stats.latencies) > 0:
+        mean_latency = \
+            sum(grab_stats.latencies) / len(grab_stats.latencies)
+        max_latency = max(grab_stats.latencies)
+    sustained = \
+        delivered_fps >= step_params.capture_fps * RAMP_FPS_TOLERANCE \
+        and skipped <= (frames + skipped) * RAMP_MAX_SKIPPED_FRACTION \
+        and grab_stats.timeouts == 0 and grab_stats.errors == 0
+    return RampStepResult(
+        capture_fps=step_params.capture_fps, exposure=exposure,
+        save_images=step_params.save_images,
+        delivered_fps=delivered_fps, frames=frames, skipped=skipped,
+        timeouts=grab_stats.timeouts, errors=grab_stats.errors,
+        mean_latency=mean_latency, max_latency=max_latency,
+        sustained=sustained)
+
+
+def getRampLogFileName(timestamp: str) -> str:
+    # Create ramp test log file name from unix time
+    ramp_log_file_name = "TitaniaTestRamp_" + timestamp + ".txt"
+    return ramp_log_file_name
+
+
+def saveRampStep(step_result: RampStepResult, ramp_log_filepath) -> None:
+    # create log message for ramp step
+    step_msg = "{},{},{},{:.3F},{},{},{},{},{:.6F},{:.6F},{}\n".format(
+        step_result.capture_fps, step_result.exposure,
+        int(step_result.save_images), step_result.delivered_fps,
+        step_result.frames, step_result.skipped, step_result.timeouts,
+        step_result.errors, step_result.mean_latency,
+        step_result.max_latency, int(step_result.sustained))
+    print(step_msg)
+    f = open(ramp_log_filepath, "a")
+    f.write(step_msg)
+    f.close()
+
+
+def runRamp(test_params: TitaniaTestParams, capture_fps_steps: list,
+            hold_time: float, exposure_steps: list = None) -> int:
+    # Find the maximum sustainable capture rate
+    # Runs the test for hold_time seconds at each capture rate
+    # in capture_fps_steps (and each exposure in exposure_steps if given)
+    # with and without image saving. A ramp stops at the first capture
+    # rate that is not sustained.
+    test_start_time = datetime.datetime.now()
+    timestamp = test_start_time.strftime('%Y-%m-%d_%H_%M_%S_%f')
+    if not os.path.exists(test_params.output_folderpath):
+        os.makedirs(test_params.output_folderpath)
+    ramp_log_filepath = os.path.join(
+        test_params.output_folderpath, getRampLogFileName(timestamp))
+    f = open(ramp_log_filepath, "w")
+    f.write("capture_fps,exposure,save_images,delivered_fps,frames,"
+            "skipped,timeouts,errors,mean_latency,max_latency,sustained\n")
+    f.close()
+
+    print("Ramp test started: ", timestamp)
+
+    if exposure_steps is None:
+        # Use the exposure of each camera from test params
+        exposure_steps = [None]
+    save_modes = [False]
+    if test_params.save_images:
+        save_modes.append(True)
+
+    sustainable_fps = {}
+    for exposure in exposure_steps:
+        cameras = test_params.cameras
+        if exposure is not None:
+            cameras = [
+                camera._replace(exposure=exposure) for camera in cameras]
+        exposure_msg = getRampExposure(cameras, exposure)
+        for save_images in save_modes:
+            max_sustained_fps = None
+            limit_reached = False
+            for capture_fps in sorted(capture_fps_steps):
+                step_folderpath = os.path.join(
+                    test_params.output_folderpath, "ramp_" + timestamp,
+                    "{}fps_{}us_{}".format(
+                        capture_fps, exposure_msg,
+                        "save" if save_images else "nosave"))
+                step_params = test_params._replace(
+                    cameras=cameras, output_folderpath=step_folderpath,
+                    capture_fps=capture_fps, save_fps=capture_fps,
+                    save_images=save_images, adaptive_save=False,
+                    timeout=hold_time)
+                print("Ramp step: {} fps, exposure: {}, "
+                      "save images: {}".format(
+                          capture_fps, exposure_msg, save_images))
+                grab_stats = GrabStatistics(len(cameras))
+                # Save every grab to measure the full save load
+                exit_code = run(
+                    step_params, grab_stats, save_all_frames=save_images)
+                if exit_code != 0:
+                    print("Ramp test stopped")
+                    return exit_code
+                step_result = getRampStepResult(
+                    step_params, exposure_msg, grab_stats)
+                saveRampStep(step_result, ramp_log_filepath)
+                if not step_result.sustained:
+                    limit_reached = True
+                    break
+                max_sustained_fps = capture_fps
+            sustainable_fps[(exposure_msg, save_images)] = \
+                (max_sustained_fps, limit_reached)
+
+    # Report maximum sustainable capture rate
+    for (exposure, save_images), (max_fps, limit_reached) in \
+            sustainable_fps.items():
+        if max_fps is None:
+            max_fps_msg = "none (lowest capture rate not sustained)"
+        elif limit_reached:
+            max_fps_msg = "{}".format(max_fps)
+        else:
+            # All capture rates in the schedule were sustained
+            max_fps_msg = ">= {} (limit not reached)".format(max_fps)
+        print("Max sustainable capture FPS (exposure: {}, "
+              "save images: {}): {}".format(
+                  exposure, save_images, max_fps_msg))
+    return 0
+
+
 # Entry point used to debug Titania Test
 def main() -> int:
     # Choose params
@@ -639,6 +1882,13 @@ def main() -> int:
     capture_temp = True
     enable_external_serial = True
     exposure = 110000.0  # us
+    adaptive_save = False
+    min_save_fps = 0.1
+    steady_state_threshold = 0.1  # C/min
+    steady_state_window = 300.0  # seconds
+    create_thumbnails = False
+    control_port = 0  # zero = no control channel
+    profile_period = 0.0  # zero = no profiling
 
     enableCameraEmulation(virtual_cams)
     # Check connected devices against arguments
@@ -661,7 +1911,8 @@ def main() -> int:
             raise Exception("Failed to find serial device for external data")
     # Define test parameters
     test_params = TitaniaTestParams(
-        left_serial=left_serial, right_serial=right_serial,
+        cameras=getStereoCameraParams(
+            left_serial, right_serial, exposure, exposure),
         output_folderpath=output_folderpath,
         capture_fps=capture_fps,
         save_fps=save_fps,
@@ -671,8 +1922,13 @@ def main() -> int:
         external_serial_port=external_serial_port,
         virtual_camera=virtual_cams,
         timeout=timeout,
-        left_exposure=exposure,
-        right_exposure=exposure
+        adaptive_save=adaptive_save,
+        min_save_fps=min_save_fps,
+        steady_state_threshold=steady_state_threshold,
+        steady_state_window=steady_state_window,
+        create_thumbnails=create_thumbnails,
+        control_port=control_port,
+        profile_period=profile_period
     )
     validateTitaniaTestParams(test_params)
     # Run test
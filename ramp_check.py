@@ -0,0 +1,90 @@
+import sys
+import os
+import glob
+import tempfile
+import TitaniaTest
+
+
+# Runs a short ramp test against emulated cameras and checks the results.
+# Used in CI to check the ramp test without camera hardware:
+#   python ramp_check.py
+RAMP_FPS = [2.0, 5.0]
+RAMP_HOLD = 5.0
+
+
+def main() -> int:
+    TitaniaTest.enableCameraEmulation(True)
+    left_serial, right_serial = TitaniaTest.getSerialPairConnected()
+    output_folderpath = tempfile.mkdtemp(prefix="TitaniaRampCheck_")
+    test_params = TitaniaTest.TitaniaTestParams(
+        cameras=TitaniaTest.getStereoCameraParams(
+            left_serial, right_serial, 10000.0, 10000.0),
+        output_folderpath=output_folderpath,
+        capture_fps=max(RAMP_FPS),
+        save_fps=max(RAMP_FPS),
+        save_images=True,
+        capture_temperature=True,
+        enable_external_serial=False,
+        external_serial_port=None,
+        virtual_camera=True,
+        timeout=0.0,
+        adaptive_save=False,
+        min_save_fps=0.1,
+        steady_state_threshold=0.1,
+        steady_state_window=300.0,
+        create_thumbnails=False,
+        control_port=0,
+        profile_period=0.0
+    )
+    TitaniaTest.validateTitaniaTestParams(test_params)
+    exit_code = TitaniaTest.runRamp(test_params, RAMP_FPS, RAMP_HOLD)
+    if exit_code != 0:
+        print("RAMP CHECK FAILED. Ramp test exit code: ", exit_code)
+        return exit_code
+
+    # Check a step was logged with and without image saving
+    ramp_log_filepaths = glob.glob(
+        os.path.join(output_folderpath, "TitaniaTestRamp_*.txt"))
+    if len(ramp_log_filepaths) != 1:
+        print("RAMP CHECK FAILED. Ramp log file not found")
+        return 1
+    f = open(ramp_log_filepaths[0], "r")
+    header = f.readline().rstrip().split(",")
+    steps = [dict(zip(header, line.rstrip().split(","))) for line in f]
+    f.close()
+    for save_images in ["0", "1"]:
+        save_steps = [
+            step for step in steps if step["save_images"] == save_images]
+        if len(save_steps) == 0:
+            print("RAMP CHECK FAILED. No steps with save_images: "
+                  + save_images)
+            return 1
+        for step in save_steps:
+            if int(step["frames"]) == 0:
+                print("RAMP CHECK FAILED. No frames grabbed at "
+                      + step["capture_fps"] + " fps")
+                return 1
+
+    # Check every grab was saved in steps with image saving
+    for step_folderpath in glob.glob(
+            os.path.join(output_folderpath, "ramp_*", "*_save")):
+        capture_fps = os.path.basename(step_folderpath).split("fps")[0]
+        step = [
+            step for step in steps if step["save_images"] == "1"
+            and step["capture_fps"] == capture_fps][0]
+        num_images = len(glob.glob(
+            os.path.join(step_folderpath, "*", "*", "*.png")))
+        # The first grab of a step is saved but not counted in frames
+        if num_images < int(step["frames"]):
+            print("RAMP CHECK FAILED. {} images saved for {} frames "
+                  "at {} fps".format(
+                      num_images, step["frames"], capture_fps))
+            return 1
+
+    print("Ramp check passed. Results: " + output_folderpath)
+    return 0
+
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
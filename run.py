@@ -3,6 +3,9 @@ import sys
 import os
 import TitaniaTest
 
+# Camera exposure (us) used if not specified
+DEFAULT_EXPOSURE = 110000.0
+
 
 def parse_args() -> argparse.Namespace:
     # parse command line argument
@@ -37,6 +40,14 @@ def parse_args() -> argparse.Namespace:
         Camera serial number for right camera. \
         If not specified will connect to first two \
         basler cameras found connected.")
+    parser.add_argument('--camera', type=str, action='append', default=[],
+                        help="\
+        Camera to use in test given as 'SERIAL:ROLE' or \
+        'SERIAL:ROLE:EXPOSURE' (exposure in us). \
+        Repeat for each camera to test any number of cameras. \
+        Role is used to name log columns and images (e.g. 'front') \
+        and may only contain letters, numbers and '-'. \
+        Cannot be used with left_serial, right_serial or titania_serial.")
     parser.add_argument('--titania_serial', type=str, default="", help="\
         Titania unique serial number. \
         Found printed on the back of Titania.")
@@ -45,10 +56,55 @@ def parse_args() -> argparse.Namespace:
         Cameras are expected with serials '0815-0000' & '0815-0001'")
     parser.add_argument('--timeout', type=float, default=0.0, help="\
         Maximum time to run test (seconds).")
-    parser.add_argument('--left_exposure', type=float, default=110000.0, help="\
+    parser.add_argument('--left_exposure', type=float,
+                        default=DEFAULT_EXPOSURE, help="\
         Left camera exposure (us)")
-    parser.add_argument('--right_exposure', type=float, default=110000.0, help="\
+    parser.add_argument('--right_exposure', type=float,
+                        default=DEFAULT_EXPOSURE, help="\
         Right camera exposure (us)")
+    parser.add_argument('--adaptive_save', action='store_true', help="\
+        Adapt save rate to camera temperature. \
+        Saves at save_fps while temperature is changing and \
+        at min_save_fps once temperature is steady. \
+        Requires temperature capture.")
+    parser.add_argument('--min_save_fps', type=float, default=0.1, help="\
+        Data save rate (frames per second) used at thermal steady state. \
+        Requires 'adaptive_save' to be set.")
+    parser.add_argument('--steady_state_threshold', type=float, default=0.1,
+                        help="\
+        Temperature rate of change (C/min) below which \
+        cameras are considered at steady state.")
+    parser.add_argument('--steady_state_window', type=float, default=300.0,
+                        help="\
+        Time window (seconds) used to estimate temperature rate of change.")
+    parser.add_argument('--thumbnails', action='store_true', help="\
+        Create thumbnails and hourly contact sheets of saved images \
+        in a thumbnail store in the output folder.")
+    parser.add_argument('--build_thumbnails', action='store_true', help="\
+        Create thumbnails and hourly contact sheets for the images \
+        in an existing output folder then exit. \
+        No cameras are required.")
+    parser.add_argument('--control_port', type=int, default=0, help="\
+        Local TCP port for control channel used to change the test \
+        while it is running. To disable the control channel use 0.")
+    parser.add_argument('--profile_period', type=float, default=0.0, help="\
+        Time between resource profile samples (seconds). \
+        Samples memory, file descriptors, threads, python heap \
+        and camera buffers to find leaks during soak tests. \
+        To disable profiling use 0.0.")
+    parser.add_argument('--ramp', action='store_true', help="\
+        Run ramp test to find the maximum sustainable capture rate. \
+        Test is run at each capture rate in 'ramp_fps' for 'ramp_hold' \
+        seconds with and without image saving.")
+    parser.add_argument('--ramp_fps', type=float, nargs='+', default=[],
+                        help="\
+        Capture rates (frames per second) to step through in ramp test.")
+    parser.add_argument('--ramp_exposure', type=float, nargs='+', default=[],
+                        help="\
+        Camera exposures (us) to step through in ramp test. \
+        If not specified the camera exposure options are used.")
+    parser.add_argument('--ramp_hold', type=float, default=30.0, help="\
+        Time to hold each ramp step (seconds).")
     args = parser.parse_args()
     # Check arguments are valid
     # If one camera serial is given then both must be given
@@ -56,6 +112,7 @@ def parse_args() -> argparse.Namespace:
     right_serial_given = args.right_serial != ""
     titania_serial_given = args.titania_serial != ""
     external_serial_given = args.external_serial_port != ""
+    camera_given = len(args.camera) > 0
     if left_serial_given and not right_serial_given:
         err_msg = "left_serial given without right_serial. \
             Both left and right MUST be given if specifing camera serials."
@@ -69,32 +126,82 @@ def parse_args() -> argparse.Namespace:
             and left_serial or right_serial. If you have titania serial \
             left_serial and right_serial are no longer requred."
         raise Exception(err_msg)
+    if camera_given and \
+            (left_serial_given or right_serial_given or titania_serial_given):
+        err_msg = "Cannot specify camera and titania_serial, \
+            left_serial or right_serial. Use camera for each camera \
+            or titania_serial/left_serial/right_serial for a stereo pair."
+        raise Exception(err_msg)
+    for camera in args.camera:
+        camera_fields = camera.split(":")
+        if len(camera_fields) not in [2, 3]:
+            err_msg = "Invalid camera: " + camera + " Expected the format: \
+                'SERIAL:ROLE' or 'SERIAL:ROLE:EXPOSURE'"
+            raise Exception(err_msg)
     if external_serial_given and not args.enable_external_serial:
         err_msg = "External serial provided but external serial is not enabled. \
             add '--enable_external_serial' to enable external serial."
         raise Exception(err_msg)
     if args.timeout < 0.0:
         raise Exception("Timeout must be positive number in seconds.")
+    if args.thumbnails and args.disable_images:
+        raise Exception("Thumbnails require image saving. \
+            Remove '--disable_images' to use '--thumbnails'.")
+    if args.profile_period < 0.0:
+        raise Exception("Profile period must be positive number in seconds.")
+    if args.ramp and len(args.ramp_fps) == 0:
+        raise Exception("Ramp test requires capture rates. \
+            Add '--ramp_fps' with the capture rates to test.")
+    if args.ramp and args.ramp_hold <= 0.0:
+        raise Exception("Ramp hold must be positive number in seconds.")
     # Save rate must be less than or equal to capture rate
     if args.save_fps > args.capture_fps:
         raise Exception("Save FPS must be less than or equal to capture FPS")
+    if args.adaptive_save and args.disable_temp:
+        raise Exception(
+            "Adaptive save requires temperature capture. \
+                Remove '--disable_temp' to use '--adaptive_save'.")
     return args
 
 
+def parse_camera_args(camera_args: list, default_exposure: float) -> list:
+    # Get camera params from list of 'SERIAL:ROLE[:EXPOSURE]' strings
+    cameras = []
+    for camera in camera_args:
+        camera_fields = camera.split(":")
+        exposure = default_exposure
+        if len(camera_fields) == 3:
+            exposure = float(camera_fields[2])
+        cameras.append(TitaniaTest.CameraParams(
+            serial=camera_fields[0], role=camera_fields[1],
+            exposure=exposure, flip_image=False))
+    return cameras
+
+
 def main() -> int:
     # Get command line arguments
     args = parse_args()
+    if args.build_thumbnails:
+        # Create thumbnails for existing test output
+        exit_code = TitaniaTest.buildThumbnailStore(args.output)
+        return exit_code
     TitaniaTest.enableCameraEmulation(args.virtual)
     # Check connected devices against arguments
     left_serial = None
     right_serial = None
-    if args.left_serial != "":
+    cameras = None
+    if len(args.camera) > 0:
+        # If cameras are specified then check they are connected
+        cameras = parse_camera_args(args.camera, DEFAULT_EXPOSURE)
+        TitaniaTest.checkCameraSerialsConnected(
+            [camera.serial for camera in cameras])
+    elif args.left_serial != "":
         # If serials are specified then check they are connected
         TitaniaTest.checkSerialPairConnected(
             args.left_serial, args.right_serial)
         left_serial = args.left_serial
         right_serial = args.right_serial
-    if args.left_serial == "":
+    if cameras is None and args.left_serial == "":
         if args.titania_serial == "":
             # If serials are not specifed then
             # check only two cameras are connected and get their serials
@@ -106,10 +213,14 @@ def main() -> int:
             left_serial, right_serial = \
                 TitaniaTest.getLeftRightSerialFromTitaniaSerial(
                     args.titania_serial)
-    if left_serial is None or right_serial is None:
-        # This shouldn't be possible as previous error checking
-        # should always set serials or raise an exception
-        raise Exception("Failed to get valid camera serials")
+    if cameras is None:
+        if left_serial is None or right_serial is None:
+            # This shouldn't be possible as previous error checking
+            # should always set serials or raise an exception
+            raise Exception("Failed to get valid camera serials")
+        cameras = TitaniaTest.getStereoCameraParams(
+            left_serial, right_serial,
+            args.left_exposure, args.right_exposure)
     external_serial_port = None
     if args.enable_external_serial:
         if args.external_serial_port == "":
@@ -128,7 +239,7 @@ def main() -> int:
 
     # Define test parameters
     test_params = TitaniaTest.TitaniaTestParams(
-        left_serial=left_serial, right_serial=right_serial,
+        cameras=cameras,
         output_folderpath=args.output,
         capture_fps=args.capture_fps,
         save_fps=args.save_fps,
@@ -138,10 +249,23 @@ def main() -> int:
         external_serial_port=external_serial_port,
         virtual_camera=args.virtual,
         timeout=args.timeout,
-        left_exposure=args.left_exposure,
-        right_exposure=args.right_exposure
+        adaptive_save=args.adaptive_save,
+        min_save_fps=args.min_save_fps,
+        steady_state_threshold=args.steady_state_threshold,
+        steady_state_window=args.steady_state_window,
+        create_thumbnails=args.thumbnails,
+        control_port=args.control_port,
+        profile_period=args.profile_period
     )
     TitaniaTest.validateTitaniaTestParams(test_params)
+    if args.ramp:
+        # Run ramp test
+        ramp_exposure = None
+        if len(args.ramp_exposure) > 0:
+            ramp_exposure = args.ramp_exposure
+        exit_code = TitaniaTest.runRamp(
+            test_params, args.ramp_fps, args.ramp_hold, ramp_exposure)
+        return exit_code
     # Run test
     exit_code = TitaniaTest.run(test_params)
     return exit_code